@@ -1,11 +1,15 @@
 import pathlib
 import re
 from enum import Enum
+from typing import Iterable
 
 
 # Primername versions
 V2_PRIMERNAME = r"^[a-zA-Z0-9\-]+_[0-9]+_(LEFT|RIGHT)_[0-9]+$"
 V1_PRIMERNAME = r"^[a-zA-Z0-9\-]+_[0-9]+_(LEFT|RIGHT)(_ALT[0-9]*|_alt[0-9]*)*$"
+# Compiled once, as they are checked for every line of a bedfile
+V2_PRIMERNAME_RE = re.compile(V2_PRIMERNAME)
+V1_PRIMERNAME_RE = re.compile(V1_PRIMERNAME)
 
 
 class PrimerNameVersion(Enum):
@@ -20,9 +24,9 @@ def determine_primername_version(primername: str) -> PrimerNameVersion:
     :param primername: The primername to check
     :return: The primername version
     """
-    if re.search(V2_PRIMERNAME, primername):
+    if V2_PRIMERNAME_RE.search(primername):
         return PrimerNameVersion.V2
-    elif re.search(V1_PRIMERNAME, primername):
+    elif V1_PRIMERNAME_RE.search(primername):
         return PrimerNameVersion.V1
     else:
         return PrimerNameVersion.INVALID
@@ -52,6 +56,7 @@ def convert_v1_primernames_to_v2(primername: str) -> str:
 # Bedfile versions
 ## This doesn't parse the contents just the structure
 BEDFILE_LINE = r"^\S+\t\d+\t\d+\t\S+\t\d+\t(\+|\-)\t[a-zA-Z]+$"
+BEDFILE_LINE_RE = re.compile(BEDFILE_LINE)
 
 
 class BEDFILERESULT(Enum):
@@ -64,27 +69,47 @@ def validate_bedfile_line_structure(line: str) -> bool:
     line = line.strip()
     if line.startswith("#"):
         return True
-    return re.search(BEDFILE_LINE, line) is not None
+    return BEDFILE_LINE_RE.search(line) is not None
 
 
-def validate_bedfile(bedfile: pathlib.Path) -> BEDFILERESULT:
-    # Read in the bedfile string
-    bedfile_str = bedfile.read_text()
-
-    # Split the bedfile into lines
-    bedlines = bedfile_str.split("\n")
-
-    # Check each line
-    for line in bedlines:
-        if not validate_bedfile_line_structure(line):
-            return BEDFILERESULT.INVALID_STRUCTURE
+def parse_and_validate_bedfile(
+    bedfile: pathlib.Path,
+) -> tuple[BEDFILERESULT, "BedfileVersion"]:
+    """
+    Validate the bedfile and determine its version from a single read
+    :param bedfile: The path to the bedfile
+    :return: The validation result, and the bedfile version (INVALID unless VALID)
+    """
+    # Stream the bedfile, checking each line and keeping the split lines to determine the version
+    # Exits on the first invalid line without reading the rest of the file
+    bedlines: list[list[str]] = []
+    raw_line = ""
+    with open(bedfile) as f:
+        for raw_line in f:
+            # Strip once, for both the structure check and the split
+            line = raw_line.strip()
+            if line.startswith("#"):  # Header line
+                continue
+            if BEDFILE_LINE_RE.search(line) is None:
+                return BEDFILERESULT.INVALID_STRUCTURE, BedfileVersion.INVALID
+            bedlines.append(line.split("\t"))
+
+    # An empty file, or a trailing newline, leaves a final empty line which is invalid
+    if not raw_line or raw_line.endswith("\n"):
+        return BEDFILERESULT.INVALID_STRUCTURE, BedfileVersion.INVALID
 
     # Check the bedfile names.
-    match determine_bedfile_version(bedfile):
+    bedfile_version = determine_bedfile_version(bedlines)
+    match bedfile_version:
         case BedfileVersion.INVALID:
-            return BEDFILERESULT.INVALID_VERSION
+            return BEDFILERESULT.INVALID_VERSION, bedfile_version
         case _:
-            return BEDFILERESULT.VALID
+            return BEDFILERESULT.VALID, bedfile_version
+
+
+def validate_bedfile(bedfile: pathlib.Path) -> BEDFILERESULT:
+    result, _ = parse_and_validate_bedfile(bedfile)
+    return result
 
 
 # bedfile versions
@@ -117,16 +142,25 @@ def determine_bedfile_version(input: list[list] | pathlib.Path) -> BedfileVersio
         return BedfileVersion.V1
 
     # If 7 cols then v2 or v3
-    # Check from primername
-    primernames = [x[3] for x in bedlines]
-    primer_name_versions = {determine_primername_version(x) for x in primernames}
-    if primer_name_versions == {PrimerNameVersion.V1}:
+    # Check from primername. All primernames must share the first's version
+    primername_version = determine_primername_version(bedlines[0][3])
+    if primername_version == PrimerNameVersion.INVALID:
+        return BedfileVersion.INVALID
+
+    # The v1 and v2 patterns are mutually exclusive, so each primername only needs the first's pattern
+    primername_re = (
+        V1_PRIMERNAME_RE
+        if primername_version == PrimerNameVersion.V1
+        else V2_PRIMERNAME_RE
+    )
+    for bedline in bedlines:
+        if primername_re.match(bedline[3]) is None:
+            # Mix of v1, v2 or invalid. Exit on the first mismatch
+            return BedfileVersion.INVALID
+
+    if primername_version == PrimerNameVersion.V1:
         return BedfileVersion.V2
-    elif primer_name_versions == {PrimerNameVersion.V2}:
-        return BedfileVersion.V3
-    # Invalid if we get here
-    # Mix of v1, v2 or invalid
-    return BedfileVersion.INVALID
+    return BedfileVersion.V3
 
 
 class BedLine:
@@ -179,6 +213,26 @@ def read_bedlines(bedfilepath: pathlib.Path) -> tuple[list[BedLine], list[str]]:
     return bedlines, bedfile_header
 
 
+def parse_bedlines(lines: Iterable[str]) -> tuple[list[list[str]], list[str]]:
+    """
+    Parses bedfile lines into a list of lists of strings, and the header lines
+
+    :return: bedfile_list, bedfile_header
+    """
+    bedfile_list: list[list[str]] = []
+    bedfile_header: list[str] = []
+
+    for line in lines:
+        line = line.strip()
+        # Header line
+        if line.startswith("#"):
+            bedfile_header.append(line)
+        elif line:  # If not empty
+            bedfile_list.append(line.split("\t"))
+
+    return bedfile_list, bedfile_header
+
+
 def read_bed_file(bedfilepath: pathlib.Path) -> tuple[list[list[str]], list[str]]:
     """
     Reads a bed file and returns a list of lists of strings.
@@ -187,15 +241,4 @@ def read_bed_file(bedfilepath: pathlib.Path) -> tuple[list[list[str]], list[str]
     """
 
     with open(bedfilepath, "r") as bedfile:
-        bedfile_list: list[list[str]] = []
-        bedfile_header: list[str] = []
-
-        for line in bedfile:
-            line = line.strip()
-            # Header line
-            if line.startswith("#"):
-                bedfile_header.append(line)
-            elif line:  # If not empty
-                bedfile_list.append(line.split("\t"))
-
-    return bedfile_list, bedfile_header
+        return parse_bedlines(bedfile)
@@ -2,15 +2,38 @@ import pathlib
 import json
 import sys
 import hashlib
+import mmap
+import os
+from typing import Iterator
 from primal_page.schemas import PrimerClass
 
 
-def hashfile(fname):
-    hash_md5 = hashlib.md5()
+def hashfile(fname: pathlib.Path) -> str:
+    """
+    Returns the md5 hexdigest of a file
+        - Python >= 3.11 hashes via hashlib.file_digest, which loops in C
+        - Otherwise the file is mmapped and hashed in a single call
+    """
     with open(fname, "rb") as f:
-        for chunk in iter(lambda: f.read(4096), b""):
-            hash_md5.update(chunk)
-    return hash_md5.hexdigest()
+        if hasattr(hashlib, "file_digest"):
+            return hashlib.file_digest(f, "md5").hexdigest()
+
+        # Empty files cannot be mmapped
+        if os.fstat(f.fileno()).st_size == 0:
+            return hashlib.md5().hexdigest()
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            return hashlib.md5(mm).hexdigest()
+
+
+def iter_subdirs(path: pathlib.Path) -> Iterator[pathlib.Path]:
+    """
+    Yields the subdirectories of path
+        - Uses os.scandir, so the dir check comes from the directory listing without a stat per entry
+    """
+    with os.scandir(path) as entries:
+        for entry in entries:
+            if entry.is_dir():
+                yield pathlib.Path(entry.path)
 
 
 def create_rawlink(repo, scheme_name, length, version, file, pclass) -> str:
@@ -23,8 +46,7 @@ def parse_version(
     version_dict = dict()
 
     # Read in the info.json file
-    with open(version_path / "info.json") as f:
-        info_dict = json.load(f)
+    info_dict = json.loads((version_path / "info.json").read_bytes())
 
     # Grab index.json fields
     version_dict["algorithmversion"] = info_dict["algorithmversion"]
@@ -81,11 +103,7 @@ def parse_length(length_path, repo_url, scheme_name, length, pclass) -> dict[str
     length_dict = dict()
 
     # Get all the versions
-    for version in length_path.iterdir():
-        # Only add directories
-        if not version.is_dir():
-            continue
-
+    for version in iter_subdirs(length_path):
         # Parse the version
         version_dict = parse_version(
             version_path=version,
@@ -106,11 +124,7 @@ def parse_scheme(scheme_path, repo_url, scheme_name, pclass) -> dict[str, str]:
     scheme_dict = dict()
 
     # Get all the lengths
-    for length in scheme_path.iterdir():
-        # Only add directories
-        if not length.is_dir():
-            continue
-
+    for length in iter_subdirs(scheme_path):
         # Parse the length
         length_dict = parse_length(
             length_path=length,
@@ -203,9 +217,9 @@ def create_index(
     for pclass in pclasses:
         # Create a dict to hold all the pclass data
         pclass_dict = dict()
-        for path in (parent_dir / pclass).iterdir():
-            # Only add directories
-            if not path.is_dir() or path.name.startswith("."):
+        for path in iter_subdirs(parent_dir / pclass):
+            # Skip hidden directories
+            if path.name.startswith("."):
                 continue
 
             # Get the Scheme name
@@ -80,7 +80,7 @@ def create_md(
         page.write("```" + "\n")
 
         # Write the config file
-        config_json = json.load(open(config, "r"))
+        config_json = json.loads(pathlib.Path(config).read_bytes())
 
         page.write("## Config\n\n")
         page.write("```json" + "\n")
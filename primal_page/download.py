@@ -1,14 +1,39 @@
 import json
+import os
+import threading
 import requests
+from concurrent.futures import ThreadPoolExecutor
 import hashlib
 import pathlib
 import sys
+from typing import Optional
+
+# Number of schemes downloaded concurrently by download_all_func
+DOWNLOAD_WORKERS = 16
+
+# requests.Session is not documented as thread-safe, so each thread gets its own
+_thread_local = threading.local()
+
+
+def get_session() -> requests.Session:
+    """
+    Returns this thread's requests.Session, creating it on first use
+        - Connections are reused across the downloads made by one thread
+    """
+    session = getattr(_thread_local, "session", None)
+    if session is None:
+        session = requests.Session()
+        _thread_local.session = session
+    return session
 
 
 def validate_hashes(input_text: str, expected_hash: str, output_file: pathlib.Path):
     """
     Validate the hash of the input text. If the hash does not match the expected hash, raise a ValueError.
     If the hash does match, write the input text to the output file.
+
+    Downloads stream through _download_verified instead. This is kept as the public helper
+    for validating text that is already in memory.
     """
     input_hash = hashlib.md5(input_text.encode()).hexdigest()
     if input_hash != expected_hash:
@@ -21,6 +46,34 @@ def validate_hashes(input_text: str, expected_hash: str, output_file: pathlib.Pa
         f.write(input_text)
 
 
+def _download_verified(
+    url: str, dest: pathlib.Path, expected_md5: Optional[str] = None
+):
+    """
+    Stream url to dest, hashing each chunk as it is written.
+    The file is only moved into place if the hash matches the expected hash.
+    If expected_md5 is None, the file is written without a hash check.
+    """
+    tmp_path = dest.with_name(dest.name + ".tmp")
+    input_hash = hashlib.md5()
+    try:
+        with get_session().get(url, stream=True) as r:
+            r.raise_for_status()
+            with open(tmp_path, "wb") as f:
+                for chunk in r.iter_content(1 << 20):
+                    input_hash.update(chunk)
+                    f.write(chunk)
+
+        if expected_md5 is not None and input_hash.hexdigest() != expected_md5:
+            raise ValueError(
+                f"WARNING: HASH MISMATCH: Expected {expected_md5} but got {input_hash.hexdigest()}. File not saved to disk."
+            )
+        os.replace(tmp_path, dest)
+    except BaseException:
+        tmp_path.unlink(missing_ok=True)
+        raise
+
+
 def download_scheme_func(
     schemename: str,
     ampliconsize: str,
@@ -41,33 +94,23 @@ def download_scheme_func(
         )
 
     # Create the output directory
-    scheme_dir = output_dir / schemename / str(ampliconsize) / schemeversion
+    scheme_dir = output_dir.joinpath(schemename, str(ampliconsize), schemeversion)
     scheme_dir.mkdir(parents=True, exist_ok=True)
 
-    # Download the bedfile
-    bedfile_url = scheme["primer_bed_url"]
-    bedfile_text = requests.get(bedfile_url).text
-
-    # Validate the hash before write the file
-    validate_hashes(bedfile_text, scheme["primer_bed_md5"], scheme_dir / "primer.bed")
-
-    # Download the reference
-    reference_url = scheme["reference_fasta_url"]
-    reference_text = requests.get(reference_url).text
+    # Download the bedfile, validating the hash before it is saved
+    _download_verified(
+        scheme["primer_bed_url"], scheme_dir / "primer.bed", scheme["primer_bed_md5"]
+    )
 
-    # Validate the hash before write the file
-    validate_hashes(
-        reference_text,
-        scheme["reference_fasta_md5"],
+    # Download the reference, validating the hash before it is saved
+    _download_verified(
+        scheme["reference_fasta_url"],
         scheme_dir / "reference.fasta",
+        scheme["reference_fasta_md5"],
     )
 
-    # Download the info.json
-    info_url = scheme["info_json_url"]
-    info_text = requests.get(info_url).text
-    # Write the file
-    with open(scheme_dir / "info.json", "w") as f:
-        f.write(info_text)
+    # Download the info.json. No hash is provided for it in the index
+    _download_verified(scheme["info_json_url"], scheme_dir / "info.json")
 
     print(f"Downloaded:\t{schemename}/{ampliconsize}/{schemeversion}")
 
@@ -87,17 +130,24 @@ def fetch_index(index_url: str) -> dict:
 
 def download_all_func(index: dict, output: pathlib.Path):
     """Download all schemes from the index.json"""
-    from concurrent.futures import ThreadPoolExecutor
-
     # Grab the primerschemes
     primerschemes = index.get("primerschemes", {})
 
-    # Download all the schemes
-    # Create a list of all schemes
-    schemes = []
-    for schemename in primerschemes:
-        for ampliconsize in primerschemes[schemename]:
-            for schemeversion in primerschemes[schemename][ampliconsize]:
-                download_scheme_func(
-                    schemename, ampliconsize, schemeversion, index, output
-                )
+    # Download all the schemes concurrently, as each download is latency bound
+    with ThreadPoolExecutor(max_workers=DOWNLOAD_WORKERS) as executor:
+        futures = [
+            executor.submit(
+                download_scheme_func,
+                schemename,
+                ampliconsize,
+                schemeversion,
+                index,
+                output,
+            )
+            for schemename in primerschemes
+            for ampliconsize in primerschemes[schemename]
+            for schemeversion in primerschemes[schemename][ampliconsize]
+        ]
+        # Propagate any errors
+        for future in futures:
+            future.result()
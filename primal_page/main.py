@@ -1,10 +1,16 @@
 import typer
 import pathlib
+import os
+import errno
 from typing_extensions import Annotated
 import shutil
 import hashlib
 import json
-from typing import Optional
+import contextlib
+import tempfile
+import itertools
+from typing import IO, Iterable, Iterator, NamedTuple, Optional
+from concurrent.futures import ThreadPoolExecutor
 from enum import Enum
 
 from primal_page.build_index import create_index
@@ -20,10 +26,10 @@ from primal_page.schemas import (
 from primal_page.bedfiles import (
     determine_bedfile_version,
     BedfileVersion,
-    validate_bedfile,
+    parse_and_validate_bedfile,
+    parse_bedlines,
     BEDFILERESULT,
 )
-from primal_page.download import download_all_func, download_scheme_func, fetch_index
 
 
 class FindResult(Enum):
@@ -48,21 +54,127 @@ This work is licensed under a [Creative Commons Attribution-ShareAlike 4.0 Inter
 ![](https://i.creativecommons.org/l/by-sa/4.0/88x31.png)"""
 
 
-def trim_file_whitespace(in_path: pathlib.Path, out_path: pathlib.Path):
+# The process umask, read once at import as os.umask can only be read by setting it
+_UMASK = os.umask(0)
+os.umask(_UMASK)
+
+
+@contextlib.contextmanager
+def atomic_replace(path: pathlib.Path) -> Iterator[IO[bytes]]:
+    """
+    Open a uniquely named tmp file next to path, which replaces path on leaving the block
+        - Readers see either the old or the new file, never a partially written one
+        - The mode of an existing path is kept. A new file gets the default mode for the umask
+        - If the block raises, the tmp file is removed and path is untouched
+    :param path: The path to replace
+    """
+    tmp_file = tempfile.NamedTemporaryFile(
+        dir=path.parent, prefix=f".{path.name}.", suffix=".tmp", delete=False
+    )
+    try:
+        with tmp_file:
+            yield tmp_file
+        if path.exists():
+            shutil.copymode(path, tmp_file.name)
+        else:
+            os.chmod(tmp_file.name, 0o666 & ~_UMASK)
+        os.replace(tmp_file.name, path)
+    except BaseException:
+        pathlib.Path(tmp_file.name).unlink(missing_ok=True)
+        raise
+
+
+def atomic_write_bytes(path: pathlib.Path, data: bytes):
+    """
+    Write data to path via a tmp file and os.replace, keeping the mode of an existing file
+    :param path: The path to write to
+    :param data: The bytes to write
+    """
+    with atomic_replace(path) as f:
+        f.write(data)
+
+
+def trim_file_whitespace(in_path: pathlib.Path, out_path: pathlib.Path) -> str:
     """
     Trim whitespace from the ends of a file.
-        - Reads file into memory. Not suitable for large files
+        - Streams the file in chunks, so large files are not read into memory
+        - The md5 is taken from the bytes written, so out_path is not re-read
+        - in_path and out_path can be the same file
+    :return: The md5 hexdigest of the trimmed file
+    """
+    hash_md5 = hashlib.md5()
+    # Write to a tmp file so the file can be trimmed in place
+    # in_path is closed before the tmp file replaces out_path
+    with atomic_replace(out_path) as outfile, open(in_path, "r") as infile:
+        # Whitespace is held back until it is followed by more content
+        pending = ""
+        started = False
+        for chunk in iter(lambda: infile.read(1 << 20), ""):
+            if not started:
+                chunk = chunk.lstrip()
+                started = bool(chunk)
+            content = chunk.rstrip()
+            if content:
+                data = (pending + content).encode()
+                outfile.write(data)
+                hash_md5.update(data)
+                pending = chunk[len(content) :]
+            else:
+                pending += chunk
+
+    return hash_md5.hexdigest()
+
+
+def render_readme(
+    info: Info,
+    pngs: list[pathlib.Path],
+    info_json_str: str | None = None,
+) -> str:
     """
-    with open(in_path, "r") as infile:
-        input_file = infile.read().strip()
+    Render the README.md contents for a scheme
 
-    with open(out_path, "w") as outfile:
-        outfile.write(input_file)
+    :param info: The scheme information
+    :type info: Info
+    :param pngs: The list of PNG files
+    :type pngs: list[pathlib.Path]
+    :param info_json_str: The info serialised with model_dump_json(indent=4). Serialised here if None
+    :type info_json_str: str | None
+    :return: The README.md contents
+    :rtype: str
+    """
+    if info_json_str is None:
+        info_json_str = info.model_dump_json(indent=4)
+
+    # Build the README in memory, so it is written in a single call
+    readme = [f"# {info.schemename} {info.ampliconsize}bp {info.schemeversion}\n\n"]
+
+    if info.description != None:
+        readme.append(f"## Description\n\n")
+        readme.append(f"{info.description}\n\n")
+
+    readme.append(f"## Overviews\n\n")
+    readme.extend(f"![{png.name}](work/{png.name})\n\n" for png in pngs)
+
+    readme.append(f"## Details\n\n")
+
+    # Write the detials into the readme
+    readme.append(f"""```json\n{info_json_str}\n```\n\n""")
 
+    if info.license == "CC BY-SA 4.0":
+        readme.append(LICENSE_TXT_CC_BY_SA_4_0)
 
-def regenerate_readme(path: pathlib.Path, info: Info, pngs: list[pathlib.Path]):
+    return "".join(readme)
+
+
+def regenerate_readme(
+    path: pathlib.Path,
+    info: Info,
+    pngs: list[pathlib.Path],
+    info_json_str: str | None = None,
+):
     """
     Regenerate the README.md file for a scheme
+        - The file is only rewritten if its contents have changed
 
     :param path: The path to the scheme directory
     :type path: pathlib.Path
@@ -70,36 +182,128 @@ def regenerate_readme(path: pathlib.Path, info: Info, pngs: list[pathlib.Path]):
     :type info: Info
     :param pngs: The list of PNG files
     :type pngs: list[pathlib.Path]
+    :param info_json_str: The info serialised with model_dump_json(indent=4). Serialised here if None
+    :type info_json_str: str | None
     """
+    readme = render_readme(info, pngs, info_json_str)
 
-    with open(path / "README.md", "w") as readme:
-        readme.write(
-            f"# {info.schemename} {info.ampliconsize}bp {info.schemeversion}\n\n"
-        )
+    readme_path = path / "README.md"
+    try:
+        if readme_path.read_text() == readme:
+            return
+    except FileNotFoundError:
+        pass
+    atomic_write_bytes(readme_path, readme.encode())
+
+
+# Directories that are never searched for scheme files
+# Hidden directories (.git, .venv, ...) are also skipped
+# primerschemes is the default create output, so would hold other schemes' files
+PRUNED_DIRS = {"__pycache__", "node_modules", "primerschemes"}
+
+
+def iter_scheme_files(schemepath: pathlib.Path) -> Iterator[pathlib.Path]:
+    """
+    Recursively yield all files in the scheme directory
+        - Hidden and build directories are pruned rather than descended into
+        - Symlinked directories are not followed
+        - Uses os.scandir directly, so file/dir checks come from the directory listing without extra stats
+        - Only regular files (or symlinks to them) are yielded. Broken symlinks, sockets etc are skipped
+    :param schemepath: The path to the scheme directory
+    :return: An iterator over all files found in the scheme directory
+    """
+    dirs_to_scan: list[str] = [os.fspath(schemepath)]
+    while dirs_to_scan:
+        with os.scandir(dirs_to_scan.pop()) as entries:
+            for entry in entries:
+                if entry.is_file():
+                    yield pathlib.Path(entry.path)
+                elif (
+                    entry.is_dir()
+                    and not entry.is_symlink()
+                    and not entry.name.startswith(".")
+                    and entry.name not in PRUNED_DIRS
+                ):
+                    dirs_to_scan.append(entry.path)
+
+
+def find_scheme_files(schemepath: pathlib.Path) -> list[pathlib.Path]:
+    """
+    Recursively find all files in the scheme directory. See iter_scheme_files
+    :param schemepath: The path to the scheme directory
+    :return: A list of all files found in the scheme directory
+    """
+    return list(iter_scheme_files(schemepath))
 
-        if info.description != None:
-            readme.write(f"## Description\n\n")
-            readme.write(f"{info.description}\n\n")
 
-        readme.write(f"## Overviews\n\n")
-        for png in pngs:
-            readme.write(f"![{png.name}](work/{png.name})\n\n")
+def find_pngs(scheme_path: pathlib.Path) -> list[pathlib.Path]:
+    """
+    Find the PNGs to link in the README.md
+        - PNGs are only ever copied into work/, so only that directory is listed
+    :param scheme_path: The path to the scheme directory
+    :return: A sorted list of the PNGs in work/. Empty if work/ does not exist
+    """
+    try:
+        with os.scandir(scheme_path / "work") as entries:
+            return sorted(
+                pathlib.Path(entry.path)
+                for entry in entries
+                if entry.name.endswith(".png") and entry.is_file()
+            )
+    except FileNotFoundError:
+        return []
 
-        readme.write(f"## Details\n\n")
 
-        # Write the detials into the readme
-        readme.write(f"""```json\n{info.model_dump_json(indent=4)}\n```\n\n""")
+class SchemeFiles(NamedTuple):
+    """
+    The files found in a scheme directory, bucketed by type
+    """
 
-        if info.license == "CC BY-SA 4.0":
-            readme.write(LICENSE_TXT_CC_BY_SA_4_0)
+    primer_beds: list[pathlib.Path]
+    references: list[pathlib.Path]
+    configs: list[pathlib.Path]
+    pngs: list[pathlib.Path]
+    htmls: list[pathlib.Path]
+    msas: list[pathlib.Path]
+    misc: list[pathlib.Path]
 
 
-def hashfile(fname: pathlib.Path) -> str:
-    hash_md5 = hashlib.md5()
-    with open(fname, "rb") as f:
-        for chunk in iter(lambda: f.read(4096), b""):
-            hash_md5.update(chunk)
-    return hash_md5.hexdigest()
+def classify_scheme_files(files: Iterable[pathlib.Path]) -> SchemeFiles:
+    """
+    Bucket the files of a scheme directory in a single pass, dispatching on name and extension
+        - The find_* functions are then given only their candidates, rather than every found file
+        - Multiple pngs/htmls/msas are allowed
+        - misc holds all additional files, which are copied to the working directory to preserve the originals
+    :param files: The files found in the scheme directory
+    :return: The bucketed files
+    """
+    scheme_files = SchemeFiles([], [], [], [], [], [], [])
+    suffix_buckets = {
+        ".png": scheme_files.pngs,
+        ".html": scheme_files.htmls,
+        ".fasta": scheme_files.msas,
+    }
+    for path in files:
+        name = path.name
+        if name.endswith("primer.bed"):
+            scheme_files.primer_beds.append(path)
+        elif name == "config.json":
+            scheme_files.configs.append(path)
+        elif name == "reference.fasta":
+            scheme_files.references.append(path)
+        elif name == "referance.fasta":
+            # The misspelt reference is also copied into work/ as a fasta
+            scheme_files.references.append(path)
+            scheme_files.msas.append(path)
+        elif (bucket := suffix_buckets.get(name[name.rfind(".") :])) is not None:
+            bucket.append(path)
+        elif (
+            # Dont copy other configs/infos, or the mismatches db
+            not name.endswith(("config.json", "info.json", ".db"))
+            and name != ".DS_Store"  # Dont copy the macos file
+        ):
+            scheme_files.misc.append(path)
+    return scheme_files
 
 
 def find_ref(
@@ -167,6 +371,22 @@ def find_primerbed(
         raise FileNotFoundError(f"Could not find file at {cli_primerbed}")
 
 
+def read_config(configpath: pathlib.Path) -> dict:
+    """
+    Read in a config.json, removing the fields not copied into the scheme
+    :param configpath: The path to the config.json file
+    :return: The cleaned config
+    """
+    config_json: dict = json.loads(configpath.read_bytes())
+    # Remove some paths from the config
+    # The md5 hashes are no longer used, so remove to prevent confusion
+    return {
+        k: v
+        for k, v in config_json.items()
+        if k != "output_dir" and not k.endswith("md5")
+    }
+
+
 def find_config(
     cli_config: pathlib.Path | None,
     found_files: list[pathlib.Path],
@@ -228,12 +448,13 @@ def create(
         SchemeStatus, typer.Option(help="Scheme status")
     ] = SchemeStatus.DRAFT.value,  # type: ignore
     citations: Annotated[
-        list[str], typer.Option(help="Any associated citations. Please use DOI")
-    ] = [],
-    authors: Annotated[list[str], typer.Option(help="Any authors")] = [
-        "quick lab",
-        "artic network",
-    ],
+        Optional[list[str]],
+        typer.Option(help="Any associated citations. Please use DOI"),
+    ] = None,
+    authors: Annotated[
+        Optional[list[str]],
+        typer.Option(help="Any authors. Defaults to 'quick lab' and 'artic network'"),
+    ] = None,
     primerbed: Annotated[
         Optional[pathlib.Path],
         typer.Option(
@@ -277,13 +498,37 @@ def create(
 ):
     """Create a new scheme in the required format"""
 
-    # Search for scheme repo for files
-    found_files = [x for x in schemepath.rglob("*")]
+    # Defaults are created per call, so are never shared between calls
+    if citations is None:
+        citations = []
+    if authors is None:
+        authors = ["quick lab", "artic network"]
+
+    # Validate the path components before they are used to build repo_dir
+    validate_schemename(schemename)
+    validate_schemeversion(schemeversion)
+
+    # Check if the repo already exists before doing any work
+    # Join all parts in one call, rather than creating a Path per /
+    repo_dir = output.joinpath(schemename, str(ampliconsize), schemeversion)
+    if repo_dir.exists():
+        raise FileExistsError(f"{repo_dir} already exists")
+
+    # Classify all found files in a single pass
+    # Files are classified as they are found, so the full listing is never held in memory
+    scheme_files = classify_scheme_files(iter_scheme_files(schemepath))
+    # Only one PNG per name is copied into work/. Sorted by name to match find_pngs,
+    # so a later edit does not reorder the README
+    pngs = sorted(
+        {png.name: png for png in scheme_files.pngs}.values(), key=lambda png: png.name
+    )
 
     # Check for a single primer.bed file
-    valid_primer_bed = find_primerbed(primerbed, found_files, schemepath)
+    valid_primer_bed = find_primerbed(primerbed, scheme_files.primer_beds, schemepath)
 
-    match validate_bedfile(valid_primer_bed):
+    # Validate and get the primerbed version
+    bedfile_result, primerbed_version = parse_and_validate_bedfile(valid_primer_bed)
+    match bedfile_result:
         case BEDFILERESULT.VALID:
             pass
         case BEDFILERESULT.INVALID_VERSION:
@@ -294,28 +539,20 @@ def create(
             raise ValueError(
                 f"Invalid primerbed structure for {valid_primer_bed}. Please ensure it is a valid 7 column bedfile"
             )
-    # Get primerbed version
-    primerbed_version: BedfileVersion = determine_bedfile_version(valid_primer_bed)
 
     # Find the reference.fasta file
-    valid_ref = find_ref(reference, found_files, schemepath)
+    valid_ref = find_ref(reference, scheme_files.references, schemepath)
 
     # Search for config.json
-    status, conf_path = find_config(configpath, found_files, schemepath)
+    status, conf_path = find_config(configpath, scheme_files.configs, schemepath)
     config_json: None | dict = None  # type: ignore
     if status == FindResult.FOUND and conf_path is not None:  # Second check is for mypy
         configpath = conf_path
         # Read in the config
-        config_json: dict = json.load(configpath.open())
-        # Remove some paths from the config
-        config_json.pop("output_dir", None)
-        # These hashes are no longer used, so remove to prevent confusion
-        md5s_keys_to_remove = {k for k in config_json.keys() if k.endswith("md5")}
-        for k in md5s_keys_to_remove:
-            config_json.pop(k)
+        config_json: dict = read_config(configpath)
 
         if algorithmversion is None:
-            if "algorithmversion" in config_json.keys():
+            if "algorithmversion" in config_json:
                 algorithmversion = str(config_json["algorithmversion"])
             else:
                 raise ValueError(
@@ -328,42 +565,8 @@ def create(
                 f"Could not find a config.json file in {schemepath}. Please specify manually with --configpath or specify algorithmversion with --algorithmversion"
             )
 
-    # Multiple pngs/htmls/msas are allowed
-    # The single check is mainly to prevent multiple schemes via providing the wrong directory
-    # At this point we know we have a single scheme, due to having a single primer.bed, reference.fasta, and config.json
-
-    # Search for pngs
-    pngs = [path for path in found_files if path.name.endswith(".png")]
-    # Search for html
-    html = [path for path in found_files if path.name.endswith(".html")]
-    # Search for msas
-    msas = [
-        path
-        for path in found_files
-        if path.name.endswith(".fasta") and path.name != "reference.fasta"
-    ]
-
-    # Copy all additional files to working directory
-    # This is done to prevent preserve the original files
-    misc_files_to_copy = [
-        x
-        for x in found_files
-        if not x.name.endswith("primer.bed")
-        and not x.name.endswith("config.json")
-        and not x.name.endswith("info.json")
-        and not x.name.endswith(".fasta")
-        and not x.name.endswith(".png")
-        and not x.name.endswith(".html")
-        and not x.name.endswith(".db")  # Dont copy the mismatches db
-        and x.name != ".DS_Store"  # Dont copy the macos file
-        and x.is_file()
-    ]
-
-    # Create the collections set
-    collections = {x for x in collection} if collection is not None else set()
-
     # Create the info.json
-    # Generate the md5s
+    # The lists are passed as is, Info converts them to sets during validation
     info = Info(
         ampliconsize=ampliconsize,
         schemeversion=schemeversion,
@@ -371,15 +574,15 @@ def create(
         primer_bed_md5="NONE",  # Will be updated later
         reference_fasta_md5="NONE",  # Will be updated later
         status=schemestatus,
-        citations=set(citations),
-        authors=set(authors),
+        citations=citations,
+        authors=authors,
         algorithmversion=algorithmversion,  # type: ignore
-        species=set(species),
+        species=species,
         description=description,
         derivedfrom=derivedfrom,
         primerclass=primerclass,
         articbedversion=primerbed_version,
-        collections=collections,
+        collections=collection or [],
     )
 
     #####################################
@@ -387,57 +590,94 @@ def create(
     #####################################
     # Everything needs to be validated before creating files
 
-    # Check if the repo already exists
-    repo_dir = output / schemename / str(ampliconsize) / schemeversion
-    if repo_dir.exists():
-        raise FileExistsError(f"{repo_dir} already exists")
+    # Raises FileExistsError if the repo was created since the check above
     repo_dir.mkdir(parents=True)
 
     # If this fails it will deleted the half completed scheme
     # Need to check the repo doesnt already exist
     try:
-        # Copy files and trim whitespace
-        trim_file_whitespace(valid_primer_bed, repo_dir / "primer.bed")
-        trim_file_whitespace(valid_ref, repo_dir / "reference.fasta")
-
-        # Update the hashes in the info.json
-        info.primer_bed_md5 = hashfile(repo_dir / "primer.bed")
-        info.reference_fasta_md5 = hashfile(repo_dir / "reference.fasta")
-
         working_dir = repo_dir / "work"
         working_dir.mkdir()
 
         if config_json is not None:
             # Write out the config.json
-            with open(working_dir / "config.json", "w") as configfile:
-                json.dump(config_json, configfile, indent=4, sort_keys=True)
-
-        # Copy over misc files
-        for misc_file in misc_files_to_copy:
-            shutil.copy(misc_file, working_dir / misc_file.name)
-
-        # Copy the pngs
-        for png in pngs:
-            shutil.copy(png, working_dir / png.name)
-        # Copy the htmls
-        for html in html:
-            shutil.copy(html, working_dir / html.name)
-        # Copy the msas
-        for msa in msas:
-            shutil.copy(msa, working_dir / msa.name)
+            (working_dir / "config.json").write_bytes(
+                json.dumps(config_json, indent=4, sort_keys=True).encode()
+            )
+
+        # Build destinations as strings to avoid a Path per copied file
+        # Files are keyed by destination name so each destination has a single writer
+        # As with copying in order, the last file with a given name wins
+        working_dir_str = os.fspath(working_dir)
+        files_to_copy = {
+            file.name: file
+            for file in itertools.chain(
+                scheme_files.misc,
+                scheme_files.pngs,
+                scheme_files.htmls,
+                scheme_files.msas,
+            )
+        }
+
+        # Every file is independent, so the primer.bed and reference.fasta are trimmed and hashed
+        # while the misc files, pngs, htmls and msas are copied, overlapping the IO
+        # Leaving the with block waits for all copies, so a failure never races the cleanup
+        with ThreadPoolExecutor(max_workers=min(8, 2 + len(files_to_copy))) as executor:
+            primer_bed_md5 = executor.submit(
+                trim_file_whitespace, valid_primer_bed, repo_dir / "primer.bed"
+            )
+            reference_fasta_md5 = executor.submit(
+                trim_file_whitespace, valid_ref, repo_dir / "reference.fasta"
+            )
+            copies = [
+                executor.submit(
+                    shutil.copyfile, file, os.path.join(working_dir_str, name)
+                )
+                for name, file in files_to_copy.items()
+            ]
+
+            # Update the hashes in the info.json, and surface any copy errors
+            info.primer_bed_md5 = primer_bed_md5.result()
+            info.reference_fasta_md5 = reference_fasta_md5.result()
+            for copy in copies:
+                copy.result()
 
         # Write info.json
-        with open(repo_dir / "info.json", "w") as infofile:
-            infofile.write(info.model_dump_json(indent=4))
+        # Serialise once, for both the info.json and the README.md
+        info_json_str = info.model_dump_json(indent=4)
+        atomic_write_bytes(repo_dir / "info.json", info_json_str.encode())
 
         # Create a README.md with link to all pngs
-        regenerate_readme(repo_dir, info, pngs)
+        regenerate_readme(repo_dir, info, pngs, info_json_str)
     except Exception as e:
         # Cleanup
         shutil.rmtree(repo_dir)
         raise Exception(f"{e}\nCleaning up {repo_dir}")
 
 
+@contextlib.contextmanager
+def _edit_info(schemeinfo: pathlib.Path) -> Iterator[Info]:
+    """
+    Load an info.json for editing. On leaving the block the info.json and README.md are written
+        - If the block raises, nothing is written
+        - If the info.json is unchanged, nothing is written
+    :param schemeinfo: The path to info.json
+    """
+    info = Info.model_validate_json(schemeinfo.read_bytes())
+    # Compared as dumped values, as the JSON order of the set fields depends on the hash seed
+    # Model equality is not used, as before pydantic 2.6 it also compares the fields set
+    old_info_dump = info.model_dump()
+    yield info
+
+    if info.model_dump() == old_info_dump:
+        return
+    info_json_str = info.model_dump_json(indent=4)
+    atomic_write_bytes(schemeinfo, info_json_str.encode())
+
+    scheme_path = schemeinfo.parent
+    regenerate_readme(scheme_path, info, find_pngs(scheme_path), info_json_str)
+
+
 @modify_app.command()
 def status(
     schemeinfo: Annotated[
@@ -453,22 +693,11 @@ def status(
 ):
     """Change the status field in the info.json"""
 
-    info = json.load(schemeinfo.open())
-    info = Info(**info)
-
-    if info.status == schemestatus.value:
-        raise ValueError(f"{schemeinfo} status is already {schemestatus}")
-    else:
-        info.status = schemestatus
-
-    # Write the validated info.json
-    with open(schemeinfo, "w") as infofile:
-        infofile.write(info.model_dump_json(indent=4))
-
-    # Update the README
-    scheme_path = schemeinfo.parent
-    pngs = [path for path in scheme_path.rglob("*.png")]
-    regenerate_readme(scheme_path, info, pngs)
+    with _edit_info(schemeinfo) as info:
+        if info.status == schemestatus.value:
+            raise ValueError(f"{schemeinfo} status is already {schemestatus}")
+        else:
+            info.status = schemestatus
 
 
 @modify_app.command()
@@ -483,20 +712,9 @@ def primerclass(
 ):
     """Change the primerclass field in the info.json"""
 
-    info = json.load(schemeinfo.open())
-    info = Info(**info)
-
-    # Check if author is already in the list
-    info.primerclass = primerclass
-
-    # Write the validated info.json
-    with open(schemeinfo, "w") as infofile:
-        infofile.write(info.model_dump_json(indent=4))
-
-    # Update the README
-    scheme_path = schemeinfo.parent
-    pngs = [path for path in scheme_path.rglob("*.png")]
-    regenerate_readme(scheme_path, info, pngs)
+    with _edit_info(schemeinfo) as info:
+        # Check if author is already in the list
+        info.primerclass = primerclass
 
 
 @modify_app.command()
@@ -509,22 +727,11 @@ def add_author(
 ):
     """Append an author to the authors list in the info.json file"""
 
-    info = json.load(schemeinfo.open())
-    info = Info(**info)
-
-    # Check if author is already in the list
-    if author in info.authors:
-        raise ValueError(f"{author} is already in the authors list")
-    info.authors.add(author)
-
-    # Write the validated info.json
-    with open(schemeinfo, "w") as infofile:
-        infofile.write(info.model_dump_json(indent=4))
-
-    # Update the README
-    scheme_path = schemeinfo.parent
-    pngs = [path for path in scheme_path.rglob("*.png")]
-    regenerate_readme(scheme_path, info, pngs)
+    with _edit_info(schemeinfo) as info:
+        # Check if author is already in the list
+        if author in info.authors:
+            raise ValueError(f"{author} is already in the authors list")
+        info.authors.add(author)
 
 
 @modify_app.command()
@@ -536,22 +743,11 @@ def remove_author(
     author: Annotated[str, typer.Argument(help="The author to remove")],
 ):
     """Remove an author from the authors list in the info.json file"""
-    info = json.load(schemeinfo.open())
-    info = Info(**info)
-
-    # Check if author is already not in the list
-    if author not in info.authors:
-        raise ValueError(f"{author} is already not in the authors list")
-    info.authors.remove(author)
-
-    # Write the validated info.json
-    with open(schemeinfo, "w") as infofile:
-        infofile.write(info.model_dump_json(indent=4))
-
-    # Update the README
-    scheme_path = schemeinfo.parent
-    pngs = [path for path in scheme_path.rglob("*.png")]
-    regenerate_readme(scheme_path, info, pngs)
+    with _edit_info(schemeinfo) as info:
+        # Check if author is already not in the list
+        if author not in info.authors:
+            raise ValueError(f"{author} is already not in the authors list")
+        info.authors.remove(author)
 
 
 @modify_app.command()
@@ -563,22 +759,11 @@ def add_citation(
     citation: Annotated[str, typer.Argument(help="The citation to add")],
 ):
     """Append an citation to the authors list in the info.json file"""
-    info = json.load(schemeinfo.open())
-    info = Info(**info)
-
-    # Check if citation is already in the list
-    if citation in info.citations:
-        raise ValueError(f"{citation} is areadly in the citation list")
-    info.citations.add(citation)
-
-    # Write the validated info.json
-    with open(schemeinfo, "w") as infofile:
-        infofile.write(info.model_dump_json(indent=4))
-
-    # Update the README
-    scheme_path = schemeinfo.parent
-    pngs = [path for path in scheme_path.rglob("*.png")]
-    regenerate_readme(scheme_path, info, pngs)
+    with _edit_info(schemeinfo) as info:
+        # Check if citation is already in the list
+        if citation in info.citations:
+            raise ValueError(f"{citation} is areadly in the citation list")
+        info.citations.add(citation)
 
 
 @modify_app.command()
@@ -590,21 +775,10 @@ def remove_citation(
     citation: Annotated[str, typer.Argument(help="The citation to remove")],
 ):
     """Remove an citation form the authors list in the info.json file"""
-    info = json.load(schemeinfo.open())
-    info = Info(**info)
-
-    if citation not in info.citations:
-        raise ValueError(f"{citation} is not in the citation list")
-    info.citations.remove(citation)
-
-    # Write the validated info.json
-    with open(schemeinfo, "w") as infofile:
-        infofile.write(info.model_dump_json(indent=4))
-
-    # Update the README
-    scheme_path = schemeinfo.parent
-    pngs = [path for path in scheme_path.rglob("*.png")]
-    regenerate_readme(scheme_path, info, pngs)
+    with _edit_info(schemeinfo) as info:
+        if citation not in info.citations:
+            raise ValueError(f"{citation} is not in the citation list")
+        info.citations.remove(citation)
 
 
 @modify_app.command()
@@ -616,22 +790,11 @@ def remove_collection(
     collection: Annotated[Collection, typer.Argument(help="The Collection to remove")],
 ):
     """Remove an Collection from the Collection list in the info.json file"""
-    info = json.load(schemeinfo.open())
-    info = Info(**info)
-
-    # Check if collection is already not in the list
-    if collection not in info.collections:
-        raise ValueError(f"{collection} is already not in the collection list")
-    info.collections.remove(collection)
-
-    # Write the validated info.json
-    with open(schemeinfo, "w") as infofile:
-        infofile.write(info.model_dump_json(indent=4))
-
-    # Update the README
-    scheme_path = schemeinfo.parent
-    pngs = [path for path in scheme_path.rglob("*.png")]
-    regenerate_readme(scheme_path, info, pngs)
+    with _edit_info(schemeinfo) as info:
+        # Check if collection is already not in the list
+        if collection not in info.collections:
+            raise ValueError(f"{collection} is already not in the collection list")
+        info.collections.remove(collection)
 
 
 @modify_app.command()
@@ -643,22 +806,11 @@ def add_collection(
     collection: Annotated[Collection, typer.Argument(help="The Collection to add")],
 ):
     """Add a Collection to the Collection list in the info.json file"""
-    info = json.load(schemeinfo.open())
-    info = Info(**info)
-
-    # Check if author is already not in the list
-    if collection in info.collections:
-        raise ValueError(f"{collection} is already in the collection list")
-    info.collections.add(collection)
-
-    # Write the validated info.json
-    with open(schemeinfo, "w") as infofile:
-        infofile.write(info.model_dump_json(indent=4))
-
-    # Update the README
-    scheme_path = schemeinfo.parent
-    pngs = [path for path in scheme_path.rglob("*.png")]
-    regenerate_readme(scheme_path, info, pngs)
+    with _edit_info(schemeinfo) as info:
+        # Check if author is already not in the list
+        if collection in info.collections:
+            raise ValueError(f"{collection} is already in the collection list")
+        info.collections.add(collection)
 
 
 @modify_app.command()
@@ -675,23 +827,12 @@ def description(
     ],
 ):
     """Replaces the description in the info.json file"""
-    info = json.load(schemeinfo.open())
-    info = Info(**info)
-
-    # Add the description
-    if description == "None":
-        info.description = None
-    else:
-        info.description = description.strip()
-
-    # Write the validated info.json
-    with open(schemeinfo, "w") as infofile:
-        infofile.write(info.model_dump_json(indent=4))
-
-    # Update the README
-    scheme_path = schemeinfo.parent
-    pngs = [path for path in scheme_path.rglob("*.png")]
-    regenerate_readme(scheme_path, info, pngs)
+    with _edit_info(schemeinfo) as info:
+        # Add the description
+        if description == "None":
+            info.description = None
+        else:
+            info.description = description.strip()
 
 
 @modify_app.command()
@@ -708,23 +849,12 @@ def derivedfrom(
     ],
 ):
     """Replaces the derivedfrom in the info.json file"""
-    info = json.load(schemeinfo.open())
-    info = Info(**info)
-
-    # Add the derivedfrom
-    if derivedfrom == "None":
-        info.derivedfrom = None
-    else:
-        info.derivedfrom = derivedfrom.strip()
-
-    # Write the validated info.json
-    with open(schemeinfo, "w") as infofile:
-        infofile.write(info.model_dump_json(indent=4))
-
-    # Update the README
-    scheme_path = schemeinfo.parent
-    pngs = [path for path in scheme_path.rglob("*.png")]
-    regenerate_readme(scheme_path, info, pngs)
+    with _edit_info(schemeinfo) as info:
+        # Add the derivedfrom
+        if derivedfrom == "None":
+            info.derivedfrom = None
+        else:
+            info.derivedfrom = derivedfrom.strip()
 
 
 @modify_app.command()
@@ -741,19 +871,8 @@ def license(
     ],
 ):
     """Replaces the license in the info.json file"""
-    info = json.load(schemeinfo.open())
-    info = Info(**info)
-
-    info.license = license.strip()
-
-    # Write the validated info.json
-    with open(schemeinfo, "w") as infofile:
-        infofile.write(info.model_dump_json(indent=4))
-
-    # Update the README
-    scheme_path = schemeinfo.parent
-    pngs = [path for path in scheme_path.rglob("*.png")]
-    regenerate_readme(scheme_path, info, pngs)
+    with _edit_info(schemeinfo) as info:
+        info.license = license.strip()
 
 
 @app.command()
@@ -781,6 +900,21 @@ def build_index(
     create_index(gitserver, gitaccount, parentdir, git_commit_sha, force)
 
 
+def remove_dir_if_empty(path: pathlib.Path) -> bool:
+    """
+    Remove a directory if it is empty
+        - The kernel refuses to remove a non-empty directory, so no listing is needed
+    :return: True if the directory was removed
+    """
+    try:
+        path.rmdir()
+    except OSError as e:
+        if e.errno in (errno.ENOTEMPTY, errno.EEXIST):
+            return False
+        raise
+    return True
+
+
 @app.command()
 def remove(
     schemeinfo: Annotated[
@@ -798,13 +932,10 @@ def remove(
 
     # Move up the path and remove the size directory if empty
     size_dir = schemeinfo.parent.parent
-    if len(list(size_dir.iterdir())) == 0:
-        size_dir.rmdir()
-
-    # Move up the path and remove the schemename directory if empty
-    scheme_dir = size_dir.parent
-    if len(list(scheme_dir.iterdir())) == 0:
-        scheme_dir.rmdir()
+    if remove_dir_if_empty(size_dir):
+        # Move up the path and remove the schemename directory if empty
+        # If the size directory remains, the schemename directory cannot be empty
+        remove_dir_if_empty(size_dir.parent)
 
 
 @app.command()
@@ -831,43 +962,51 @@ def regenerate(
     # Get the scheme path
     scheme_path = schemeinfo.parent
 
-    # Get the info
-    info_json = json.load(schemeinfo.open())
-
-    # Trim whitespace from primer.bed and reference.fasta
-    trim_file_whitespace(scheme_path / "primer.bed", scheme_path / "primer.bed")
-    trim_file_whitespace(
-        scheme_path / "reference.fasta", scheme_path / "reference.fasta"
-    )
+    # Get the info. Kept as a dict, as older info.json files are only valid once regenerated
+    info_json = json.loads(schemeinfo.read_bytes())
 
-    # if articbedversion not set then set it
-    articbedversion = determine_bedfile_version(scheme_path / "primer.bed")
-    if articbedversion == BedfileVersion.INVALID:
-        raise ValueError(
-            f"Could not determine artic-primerbed version for {scheme_path / 'primer.bed'}"
+    # Trim whitespace from primer.bed and reference.fasta, regenerating the hashes
+    # The reference is streamed in the background, while the primer.bed is handled below
+    reference_path = scheme_path / "reference.fasta"
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        reference_fasta_md5 = executor.submit(
+            trim_file_whitespace, reference_path, reference_path
         )
-    info_json["articbedversion"] = articbedversion.value
 
-    # Regenerate the files hashes
-    info_json["primer_bed_md5"] = hashfile(scheme_path / "primer.bed")
-    info_json["reference_fasta_md5"] = hashfile(scheme_path / "reference.fasta")
+        # primer.bed files are small, so are read once to trim, hash and get the version
+        primer_bed_path = scheme_path / "primer.bed"
+        primer_bed_str = primer_bed_path.read_text().strip()
+        primer_bed_bytes = primer_bed_str.encode()
+        atomic_write_bytes(primer_bed_path, primer_bed_bytes)
+        info_json["primer_bed_md5"] = hashlib.md5(primer_bed_bytes).hexdigest()
+
+        # if articbedversion not set then set it
+        bedlines, _header = parse_bedlines(primer_bed_str.split("\n"))
+        articbedversion = determine_bedfile_version(bedlines)
+        if articbedversion == BedfileVersion.INVALID:
+            raise ValueError(
+                f"Could not determine artic-primerbed version for {primer_bed_path}"
+            )
+        info_json["articbedversion"] = articbedversion.value
 
-    info = Info(**info_json)
+        info_json["reference_fasta_md5"] = reference_fasta_md5.result()
+
+    info = Info.model_validate(info_json)
     info.infoschema = INFO_SCHEMA
 
     # Get the pngs
-    pngs = [path for path in scheme_path.rglob("*.png")]
+    pngs = find_pngs(scheme_path)
 
     #####################################
     # Final validation and create files #
     #####################################
 
     # Write the validated info.json
-    with open(schemeinfo, "w") as infofile:
-        infofile.write(info.model_dump_json(indent=4))
+    info_json_str = info.model_dump_json(indent=4)
+    atomic_write_bytes(schemeinfo, info_json_str.encode())
 
     # Regenerate the readme
-    regenerate_readme(scheme_path, info, pngs)
+    regenerate_readme(scheme_path, info, pngs, info_json_str)
 
 
 @app.command()
@@ -881,6 +1020,9 @@ def download_all(
     ] = "https://raw.githubusercontent.com/quick-lab/primerschemes/main/index.json",
 ):
     """Download all schemes from the index.json"""
+    # Imported here as requests is slow to import and only needed for downloads
+    from primal_page.download import download_all_func, fetch_index
+
     # Fetch the index and store in memory
     index = fetch_index(index_url)
 
@@ -910,6 +1052,8 @@ def download_scheme(
     ] = "https://raw.githubusercontent.com/quick-lab/primerschemes/main/index.json",
 ):
     """Download a scheme from the index.json"""
+    # Imported here as requests is slow to import and only needed for downloads
+    from primal_page.download import download_scheme_func, fetch_index
 
     # Fetch the index and store in memory
     index = fetch_index(index_url)
@@ -1,4 +1,4 @@
-from pydantic import BaseModel, PositiveInt
+from pydantic import BaseModel, PositiveInt, field_serializer
 from pydantic.functional_validators import AfterValidator
 from typing import Annotated
 import re
@@ -10,6 +10,12 @@ INFO_SCHEMA = "v1.3.0"
 
 SCHEMENAME_PATTERN = r"^[a-z0-9][a-z0-9-]*[a-z0-9]$"
 VERSION_PATTERN = r"^v\d+\.\d+\.\d+$"
+# Unanchored, as they are always applied with fullmatch
+_SCHEMENAME_BODY = r"[a-z0-9][a-z0-9-]*[a-z0-9]"
+_VERSION_BODY = r"v\d+\.\d+\.\d+"
+# Compiled once at import, rather than looked up in re's cache on every call
+SCHEMENAME_RE = re.compile(_SCHEMENAME_BODY)
+VERSION_RE = re.compile(_VERSION_BODY)
 
 
 class PrimerClass(Enum):
@@ -26,7 +32,7 @@ class SchemeStatus(Enum):
 
 
 def validate_schemeversion(version: str) -> str:
-    if not re.match(VERSION_PATTERN, version):
+    if not VERSION_RE.fullmatch(version):
         raise ValueError(
             f"Invalid version: {version}. Must match be in form of v(int).(int).(int)"
         )
@@ -34,7 +40,7 @@ def validate_schemeversion(version: str) -> str:
 
 
 def validate_schemename(schemename: str) -> str:
-    if not re.match(SCHEMENAME_PATTERN, schemename):
+    if not SCHEMENAME_RE.fullmatch(schemename):
         raise ValueError(
             f"Invalid schemename: {schemename}. Must only contain a-z, 0-9, and -. Cannot start or end with -"
         )
@@ -47,6 +53,20 @@ def not_empty(x: list | set) -> list | set:
     return x
 
 
+def sorted_set(x: set) -> list:
+    """
+    Sort a set for serialisation, so the JSON does not depend on the hash seed
+    Enums are sorted by value, and mixed int / str sets sort ints first
+    """
+    return sorted(
+        x,
+        key=lambda value: (
+            type(value).__name__,
+            value.value if isinstance(value, Enum) else value,
+        ),
+    )
+
+
 class Collection(Enum):
     # Authors
     ARTIC = "ARTIC"
@@ -82,6 +102,12 @@ class Info(BaseModel):
     derivedfrom: str | None = None
     collections: set[Collection] = set()
 
+    @field_serializer(
+        "citations", "authors", "species", "collections", when_used="json"
+    )
+    def serialize_sets(self, x: set) -> list:
+        return sorted_set(x)
+
 
 if __name__ == "__main__":
     info = Info(
@@ -2,9 +2,31 @@ import unittest
 import pathlib
 import shutil
 import json
+import os
+import stat
+import subprocess
+import sys
 
-from primal_page.main import create, find_config, find_primerbed, find_ref, FindResult
-from primal_page.schemas import SchemeStatus
+from primal_page.main import (
+    _edit_info,
+    atomic_write_bytes,
+    classify_scheme_files,
+    create,
+    description,
+    find_config,
+    find_primerbed,
+    find_pngs,
+    find_ref,
+    find_scheme_files,
+    iter_scheme_files,
+    read_config,
+    regenerate_readme,
+    remove,
+    trim_file_whitespace,
+    FindResult,
+)
+from primal_page.build_index import hashfile
+from primal_page.schemas import Info, SchemeStatus
 
 
 class TestCreate(unittest.TestCase):
@@ -100,6 +122,102 @@ class TestCreate(unittest.TestCase):
         self.assertEqual(info["description"], None)
         self.assertEqual(info["derivedfrom"], None)
 
+    def test_create_existing(self):
+        """Test creating a scheme that already exists fails"""
+        repo_dir = (
+            self.output / self.schemename / str(self.ampliconsize) / self.schemeversion
+        )
+        repo_dir.mkdir(parents=True)
+
+        with self.assertRaises(FileExistsError):
+            create(
+                schemepath=self.schemepath,
+                output=self.output,
+                ampliconsize=self.ampliconsize,
+                schemeversion=self.schemeversion,
+                species=self.species,
+                schemename=self.schemename,
+            )
+        # Check the existing dir was not touched
+        self.assertEqual(list(repo_dir.iterdir()), [])
+        shutil.rmtree(self.output / self.schemename)
+
+    def test_create_invalid_name(self):
+        """Test an invalid schemename fails before any files are created"""
+        with self.assertRaises(ValueError):
+            create(
+                schemepath=self.schemepath,
+                output=self.output,
+                ampliconsize=self.ampliconsize,
+                schemeversion=self.schemeversion,
+                species=self.species,
+                schemename="../invalid-name",
+            )
+        self.assertFalse((self.output.parent / "invalid-name").exists())
+
+
+class TestCreateCopies(unittest.TestCase):
+    def setUp(self) -> None:
+        # A copy of the test scheme and a separate output, so the tracked test_covid output is left untouched
+        self.test_dir = pathlib.Path("tests/test_output/test_create_copies")
+        if self.test_dir.exists():
+            shutil.rmtree(self.test_dir)
+        self.schemepath = self.test_dir / "input"
+        self.output = self.test_dir / "output"
+        shutil.copytree("tests/test_input/test_covid", self.schemepath)
+
+    def tearDown(self) -> None:
+        shutil.rmtree(self.test_dir)
+
+    def test_create_duplicate_names(self):
+        """Test files sharing a name in different subdirs are copied as the last one found"""
+        # A large file and small files with the same name, so parallel copies would overlap
+        for subdir, data in [("a", b"a" * (1 << 22)), ("b", b"b"), ("c", b"c")]:
+            (self.schemepath / subdir).mkdir()
+            (self.schemepath / subdir / "notes.txt").write_bytes(data)
+
+        # The last notes.txt in the copy order is expected to win
+        expected = [
+            path
+            for path in classify_scheme_files(iter_scheme_files(self.schemepath)).misc
+            if path.name == "notes.txt"
+        ][-1]
+
+        create(
+            schemepath=self.schemepath,
+            output=self.output,
+            ampliconsize=400,
+            schemeversion="v1.0.0",
+            species=[10],
+            schemename="test-scheme",
+        )
+        notes = self.output / "test-scheme" / "400" / "v1.0.0" / "work" / "notes.txt"
+        self.assertEqual(notes.read_bytes(), expected.read_bytes())
+
+    def test_create_readme_png_order(self):
+        """Test the README from create lists PNGs in the same order as later edits"""
+        # Spread over several subdirs, so the walk order is unlikely to be sorted
+        for index, name in enumerate("hgfedcba"):
+            (self.schemepath / str(index)).mkdir()
+            (self.schemepath / str(index) / f"{name}.png").write_bytes(b"png")
+
+        create(
+            schemepath=self.schemepath,
+            output=self.output,
+            ampliconsize=400,
+            schemeversion="v1.0.0",
+            species=[10],
+            schemename="test-scheme",
+        )
+        repo_dir = self.output / "test-scheme" / "400" / "v1.0.0"
+        readme = repo_dir / "README.md"
+        readme_bytes = readme.read_bytes()
+
+        # Regenerating with the PNGs found in work/ should not change the README
+        info = Info.model_validate_json((repo_dir / "info.json").read_bytes())
+        regenerate_readme(repo_dir, info, find_pngs(repo_dir))
+        self.assertEqual(readme.read_bytes(), readme_bytes)
+
 
 class Test_Find(unittest.TestCase):
     def setUp(self) -> None:
@@ -219,5 +337,416 @@ class Test_Find(unittest.TestCase):
         self.assertEqual(result, FindResult.NOT_FOUND)
 
 
+class TestFindSchemeFiles(unittest.TestCase):
+    def setUp(self) -> None:
+        self.schemepath = pathlib.Path("tests/test_output/test_find_scheme_files")
+        if self.schemepath.exists():
+            shutil.rmtree(self.schemepath)
+
+        # Create a scheme dir containing dirs that should be pruned
+        for subdir in ["work", ".git", "__pycache__", "primerschemes"]:
+            (self.schemepath / subdir).mkdir(parents=True)
+            (self.schemepath / subdir / "file.txt").write_text(subdir)
+        (self.schemepath / "primer.bed").write_text("")
+
+    def tearDown(self) -> None:
+        shutil.rmtree(self.schemepath)
+
+    def test_find_scheme_files(self):
+        """
+        Test only files are returned, and hidden / build dirs are pruned
+        """
+        result = find_scheme_files(self.schemepath)
+        self.assertEqual(
+            sorted(result),
+            sorted(
+                [
+                    self.schemepath / "primer.bed",
+                    self.schemepath / "work" / "file.txt",
+                ]
+            ),
+        )
+
+    def test_find_scheme_files_matches_rglob(self):
+        """
+        Without any pruned dirs the result should match rglob
+        """
+        schemepath = pathlib.Path("tests/test_input/test_covid")
+        self.assertEqual(
+            sorted(find_scheme_files(schemepath)),
+            sorted(x for x in schemepath.rglob("*") if x.is_file()),
+        )
+
+    def test_find_pngs(self):
+        """
+        Test only PNGs in work/ are returned, sorted
+        """
+        (self.schemepath / "work" / "b.png").write_text("")
+        (self.schemepath / "work" / "a.png").write_text("")
+        (self.schemepath / "c.png").write_text("")
+        self.assertEqual(
+            find_pngs(self.schemepath),
+            [self.schemepath / "work" / "a.png", self.schemepath / "work" / "b.png"],
+        )
+
+    def test_find_pngs_no_work_dir(self):
+        """
+        Test a missing work/ returns no PNGs
+        """
+        shutil.rmtree(self.schemepath / "work")
+        self.assertEqual(find_pngs(self.schemepath), [])
+
+
+class TestClassifySchemeFiles(unittest.TestCase):
+    def test_classify_scheme_files(self):
+        """
+        Test each file is placed in the correct bucket
+        """
+        files = [
+            pathlib.Path(name)
+            for name in [
+                "scheme.primer.bed",
+                "reference.fasta",
+                "config.json",
+                "info.json",
+                "plot.png",
+                "plot.html",
+                "msa.fasta",
+                "mismatches.db",
+                ".DS_Store",
+                "notes.txt",
+            ]
+        ]
+        result = classify_scheme_files(files)
+        self.assertEqual(result.primer_beds, [pathlib.Path("scheme.primer.bed")])
+        self.assertEqual(result.references, [pathlib.Path("reference.fasta")])
+        self.assertEqual(result.configs, [pathlib.Path("config.json")])
+        self.assertEqual(result.pngs, [pathlib.Path("plot.png")])
+        self.assertEqual(result.htmls, [pathlib.Path("plot.html")])
+        self.assertEqual(result.msas, [pathlib.Path("msa.fasta")])
+        self.assertEqual(result.misc, [pathlib.Path("notes.txt")])
+
+
+class TestRegenerateReadme(unittest.TestCase):
+    def setUp(self) -> None:
+        self.scheme_dir = pathlib.Path("tests/test_output/test_regenerate_readme")
+        if self.scheme_dir.exists():
+            shutil.rmtree(self.scheme_dir)
+        shutil.copytree(
+            "tests/test_output/test_covid/test-data-covid/400/v1.0.0", self.scheme_dir
+        )
+        self.info = Info.model_validate_json(
+            (self.scheme_dir / "info.json").read_bytes()
+        )
+
+    def tearDown(self) -> None:
+        shutil.rmtree(self.scheme_dir)
+
+    def test_regenerate_readme_unchanged(self):
+        """
+        Test an unchanged README.md is not rewritten
+        """
+        readme = self.scheme_dir / "README.md"
+        mtime_ns = readme.stat().st_mtime_ns
+        regenerate_readme(self.scheme_dir, self.info, find_pngs(self.scheme_dir))
+        self.assertEqual(readme.stat().st_mtime_ns, mtime_ns)
+
+    def test_regenerate_readme_unchanged_multiple_authors(self):
+        """
+        Test an unchanged README.md is not rewritten when the sets have several elements,
+        whose iteration order depends on the hash seed
+        """
+        self.info.authors = {"author-a", "author-b", "author-c"}
+        (self.scheme_dir / "info.json").write_text(self.info.model_dump_json(indent=4))
+        readme = self.scheme_dir / "README.md"
+        regenerate_readme(self.scheme_dir, self.info, find_pngs(self.scheme_dir))
+        readme_bytes = readme.read_bytes()
+        mtime_ns = readme.stat().st_mtime_ns
+
+        # Hash seeds are fixed per process, so each is run in a new interpreter
+        for seed in range(6):
+            subprocess.run(
+                [
+                    sys.executable,
+                    "-c",
+                    "import sys, pathlib; "
+                    "from primal_page.main import find_pngs, regenerate_readme; "
+                    "from primal_page.schemas import Info; "
+                    "path = pathlib.Path(sys.argv[1]); "
+                    "info = Info.model_validate_json((path / 'info.json').read_bytes()); "
+                    "regenerate_readme(path, info, find_pngs(path))",
+                    str(self.scheme_dir),
+                ],
+                env={**os.environ, "PYTHONHASHSEED": str(seed)},
+                check=True,
+            )
+            self.assertEqual(readme.read_bytes(), readme_bytes)
+            self.assertEqual(readme.stat().st_mtime_ns, mtime_ns)
+
+    def test_regenerate_readme_changed(self):
+        """
+        Test a changed README.md is rewritten
+        """
+        self.info.description = "A new description"
+        regenerate_readme(self.scheme_dir, self.info, find_pngs(self.scheme_dir))
+        self.assertIn("A new description", (self.scheme_dir / "README.md").read_text())
+
+
+class TestModify(unittest.TestCase):
+    def setUp(self) -> None:
+        self.scheme_dir = pathlib.Path("tests/test_output/test_modify")
+        if self.scheme_dir.exists():
+            shutil.rmtree(self.scheme_dir)
+        shutil.copytree(
+            "tests/test_output/test_covid/test-data-covid/400/v1.0.0", self.scheme_dir
+        )
+        self.schemeinfo = self.scheme_dir / "info.json"
+
+    def tearDown(self) -> None:
+        shutil.rmtree(self.scheme_dir)
+
+    def test_modify_unchanged(self):
+        """
+        Test a modify that leaves the info.json unchanged writes nothing
+        """
+        # The test scheme has no description, so removing it is a no-op
+        mtime_ns = self.schemeinfo.stat().st_mtime_ns
+        description(self.schemeinfo, "None")
+        self.assertEqual(self.schemeinfo.stat().st_mtime_ns, mtime_ns)
+
+    def test_modify_same_value(self):
+        """
+        Test assigning a field its current value writes nothing
+        """
+        mtime_ns = self.schemeinfo.stat().st_mtime_ns
+        with _edit_info(self.schemeinfo) as info:
+            info.description = info.description
+            info.authors = set(info.authors)
+        self.assertEqual(self.schemeinfo.stat().st_mtime_ns, mtime_ns)
+
+    def test_modify_unchanged_multiple_authors(self):
+        """
+        Test a no-op modify writes nothing when the sets have several elements,
+        whose JSON order depends on the hash seed
+        """
+        info_json = json.loads(self.schemeinfo.read_bytes())
+        info_json["authors"] = ["author-a", "author-b", "author-c"]
+        self.schemeinfo.write_text(json.dumps(info_json, indent=4))
+        info_bytes = self.schemeinfo.read_bytes()
+        mtime_ns = self.schemeinfo.stat().st_mtime_ns
+
+        # Hash seeds are fixed per process, so each is run in a new interpreter
+        for seed in range(6):
+            subprocess.run(
+                [
+                    sys.executable,
+                    "-c",
+                    "import sys, pathlib; from primal_page.main import description; "
+                    "description(pathlib.Path(sys.argv[1]), 'None')",
+                    str(self.schemeinfo),
+                ],
+                env={**os.environ, "PYTHONHASHSEED": str(seed)},
+                check=True,
+            )
+            self.assertEqual(self.schemeinfo.read_bytes(), info_bytes)
+            self.assertEqual(self.schemeinfo.stat().st_mtime_ns, mtime_ns)
+
+    def test_modify_changed(self):
+        """
+        Test a modify updates both the info.json and README.md
+        """
+        description(self.schemeinfo, "A new description")
+        self.assertEqual(
+            json.loads(self.schemeinfo.read_text())["description"],
+            "A new description",
+        )
+        self.assertIn("A new description", (self.scheme_dir / "README.md").read_text())
+
+
+class TestRemove(unittest.TestCase):
+    def setUp(self) -> None:
+        self.scheme_dir = pathlib.Path("tests/test_output/test_remove/test-scheme")
+        if self.scheme_dir.exists():
+            shutil.rmtree(self.scheme_dir)
+
+        # Create two versions of the scheme
+        for version in ["v1.0.0", "v2.0.0"]:
+            version_dir = self.scheme_dir / "400" / version
+            version_dir.mkdir(parents=True)
+            (version_dir / "info.json").write_text("{}")
+
+    def tearDown(self) -> None:
+        shutil.rmtree(self.scheme_dir.parent)
+
+    def test_remove(self):
+        """
+        Test empty size and schemename dirs are only removed with the last version
+        """
+        remove(self.scheme_dir / "400" / "v1.0.0" / "info.json")
+        self.assertFalse((self.scheme_dir / "400" / "v1.0.0").exists())
+        self.assertTrue((self.scheme_dir / "400" / "v2.0.0").exists())
+
+        remove(self.scheme_dir / "400" / "v2.0.0" / "info.json")
+        self.assertFalse(self.scheme_dir.exists())
+        self.assertTrue(self.scheme_dir.parent.exists())
+
+    def test_remove_other_size(self):
+        """
+        Test the schemename dir is kept while another size dir remains
+        """
+        (self.scheme_dir / "1200").mkdir()
+        remove(self.scheme_dir / "400" / "v1.0.0" / "info.json")
+        remove(self.scheme_dir / "400" / "v2.0.0" / "info.json")
+        self.assertFalse((self.scheme_dir / "400").exists())
+        self.assertTrue((self.scheme_dir / "1200").exists())
+
+    def test_remove_not_info(self):
+        """
+        Test only info.json paths are accepted
+        """
+        with self.assertRaises(ValueError):
+            remove(self.scheme_dir / "400" / "v1.0.0")
+
+
+class TestReadConfig(unittest.TestCase):
+    configpath = pathlib.Path("tests/test_input/test_covid/config.json")
+
+    def test_read_config(self):
+        """
+        Test the output_dir and md5 fields are removed from the config
+        """
+        config_json = read_config(self.configpath)
+        self.assertNotIn("output_dir", config_json)
+        self.assertFalse(any(k.endswith("md5") for k in config_json))
+        self.assertEqual(config_json["algorithmversion"], "primalscheme3:1.0.0")
+
+    def test_read_config_copy(self):
+        """
+        Test mutating the returned config does not change later reads
+        """
+        config_json = read_config(self.configpath)
+        config_json.pop("algorithmversion")
+        self.assertIn("algorithmversion", read_config(self.configpath))
+
+    def test_read_config_nested_copy(self):
+        """
+        Test mutating a nested value in the returned config does not change later reads
+        """
+        config_json = read_config(self.configpath)
+        nested_key = next(
+            k for k, v in config_json.items() if isinstance(v, (list, dict)) and v
+        )
+        config_json[nested_key].clear()
+        self.assertTrue(read_config(self.configpath)[nested_key])
+
+
+class TestAtomicWriteBytes(unittest.TestCase):
+    def setUp(self) -> None:
+        self.outfile = pathlib.Path("tests/test_output/atomic_output.txt")
+        self.outfile.write_bytes(b"old")
+
+    def tearDown(self) -> None:
+        self.outfile.unlink(missing_ok=True)
+
+    def test_atomic_write_bytes(self):
+        """
+        Test the file is replaced, and no tmp file is left behind
+        """
+        atomic_write_bytes(self.outfile, b"new")
+        self.assertEqual(self.outfile.read_bytes(), b"new")
+        self.assertFalse(self.outfile.with_name(self.outfile.name + ".tmp").exists())
+        self.assertEqual(list(self.outfile.parent.glob(".atomic_output.txt.*")), [])
+
+    def test_atomic_write_bytes_keeps_mode(self):
+        """
+        Test replacing a file keeps its mode
+        """
+        self.outfile.chmod(0o640)
+        atomic_write_bytes(self.outfile, b"new")
+        self.assertEqual(stat.S_IMODE(self.outfile.stat().st_mode), 0o640)
+
+    def test_atomic_write_bytes_new_file(self):
+        """
+        Test a new file gets the default mode for the umask
+        """
+        self.outfile.unlink()
+        atomic_write_bytes(self.outfile, b"new")
+        umask = os.umask(0)
+        os.umask(umask)
+        self.assertEqual(stat.S_IMODE(self.outfile.stat().st_mode), 0o666 & ~umask)
+
+    def test_atomic_write_bytes_error(self):
+        """
+        Test a failed write leaves the file and no tmp file behind
+        """
+        with self.assertRaises(TypeError):
+            atomic_write_bytes(self.outfile, "not bytes")  # type: ignore
+        self.assertEqual(self.outfile.read_bytes(), b"old")
+        self.assertEqual(list(self.outfile.parent.glob(".atomic_output.txt.*")), [])
+
+
+class TestTrimFileWhitespace(unittest.TestCase):
+    def setUp(self) -> None:
+        self.outdir = pathlib.Path("tests/test_output")
+        self.infile = self.outdir / "trim_input.txt"
+        self.outfile = self.outdir / "trim_output.txt"
+        self.infile.write_text("\n  >ref\nACGT\nACGT \n\n")
+
+    def tearDown(self) -> None:
+        self.infile.unlink(missing_ok=True)
+        self.outfile.unlink(missing_ok=True)
+
+    def test_trim_file_whitespace(self):
+        """
+        Test the whitespace is trimmed and the returned hash matches the file
+        """
+        result = trim_file_whitespace(self.infile, self.outfile)
+        self.assertEqual(self.outfile.read_text(), ">ref\nACGT\nACGT")
+        self.assertEqual(result, hashfile(self.outfile))
+
+    def test_trim_file_whitespace_inplace(self):
+        """
+        Test the file can be trimmed in place
+        """
+        result = trim_file_whitespace(self.infile, self.infile)
+        self.assertEqual(self.infile.read_text(), ">ref\nACGT\nACGT")
+        self.assertEqual(result, hashfile(self.infile))
+
+    def test_trim_file_whitespace_inplace_keeps_mode(self):
+        """
+        Test trimming in place keeps the file's mode
+        """
+        self.infile.chmod(0o640)
+        trim_file_whitespace(self.infile, self.infile)
+        self.assertEqual(stat.S_IMODE(self.infile.stat().st_mode), 0o640)
+
+    def test_trim_file_whitespace_large(self):
+        """
+        Test files larger than a single read are trimmed the same as str.strip
+        """
+        text = "\n\n" + ">ref\n" + "ACGT \n\n" * 400_000 + "  \n"
+        self.infile.write_text(text)
+
+        result = trim_file_whitespace(self.infile, self.outfile)
+        self.assertEqual(self.outfile.read_text(), text.strip())
+        self.assertEqual(result, hashfile(self.outfile))
+
+    def test_trim_file_whitespace_decoded(self):
+        """
+        Test non-ASCII files, and CRLF newlines after the first read, are trimmed as text
+        """
+        for data in [
+            "\n >réf\nACGT\n \u00a0".encode(),
+            b"\n>ref\n" + b"ACGT\n" * 400_000 + b"ACGT\r\n\r\n",
+        ]:
+            self.infile.write_bytes(data)
+
+            result = trim_file_whitespace(self.infile, self.outfile)
+            self.assertEqual(
+                self.outfile.read_bytes(), self.infile.read_text().strip().encode()
+            )
+            self.assertEqual(result, hashfile(self.outfile))
+
+
 if __name__ == "__main__":
     unittest.main()
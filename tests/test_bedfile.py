@@ -1,4 +1,9 @@
-from primal_page.bedfiles import validate_bedfile, BEDFILERESULT
+from primal_page.bedfiles import (
+    validate_bedfile,
+    parse_and_validate_bedfile,
+    BEDFILERESULT,
+    BedfileVersion,
+)
 
 import unittest
 import pathlib
@@ -30,6 +35,36 @@ class TestBedfile(unittest.TestCase):
             BEDFILERESULT.INVALID_STRUCTURE,
         )
 
+    def test_parse_and_validate_bedfile(self):
+        # Valid bedfiles return their version
+        self.assertEqual(
+            parse_and_validate_bedfile(self.v2bedfile),
+            (BEDFILERESULT.VALID, BedfileVersion.V2),
+        )
+        self.assertEqual(
+            parse_and_validate_bedfile(self.v3bedfile),
+            (BEDFILERESULT.VALID, BedfileVersion.V3),
+        )
+        # Invalid bedfiles return an invalid version
+        self.assertEqual(
+            parse_and_validate_bedfile(self.invalidbedfile),
+            (BEDFILERESULT.INVALID_VERSION, BedfileVersion.INVALID),
+        )
+        self.assertEqual(
+            parse_and_validate_bedfile(self.invalidstructbedfile),
+            (BEDFILERESULT.INVALID_STRUCTURE, BedfileVersion.INVALID),
+        )
+
+    def test_parse_and_validate_bedfile_trailing_newline(self):
+        # A trailing newline leaves an empty final line, which is invalid
+        bedfile = pathlib.Path("tests/test_output/trailing_newline.primer.bed")
+        bedfile.write_text(self.v3bedfile.read_text() + "\n")
+        self.assertEqual(
+            parse_and_validate_bedfile(bedfile),
+            (BEDFILERESULT.INVALID_STRUCTURE, BedfileVersion.INVALID),
+        )
+        bedfile.unlink()
+
 
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,30 @@
+import unittest
+import pathlib
+import hashlib
+
+from primal_page.build_index import hashfile
+
+
+class TestHashfile(unittest.TestCase):
+    def test_hashfile(self):
+        """
+        Ensures hashfile matches the md5 of the full file contents
+        """
+        for path in [
+            pathlib.Path("tests/test_input/test_covid/primer.bed"),
+            pathlib.Path("tests/test_input/test_covid/reference.fasta"),
+        ]:
+            self.assertEqual(hashfile(path), hashlib.md5(path.read_bytes()).hexdigest())
+
+    def test_hashfile_empty(self):
+        """
+        Ensures empty files can be hashed
+        """
+        path = pathlib.Path("tests/test_output/empty_hashfile.txt")
+        path.write_bytes(b"")
+        self.assertEqual(hashfile(path), hashlib.md5(b"").hexdigest())
+        path.unlink()
+
+
+if __name__ == "__main__":
+    unittest.main()
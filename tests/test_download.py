@@ -1,9 +1,17 @@
 import unittest
 import pathlib
 import hashlib
+import functools
+import threading
 import requests
+from http.server import HTTPServer, SimpleHTTPRequestHandler
 
-from primal_page.download import validate_hashes, fetch_index
+from primal_page.download import (
+    validate_hashes,
+    fetch_index,
+    get_session,
+    _download_verified,
+)
 
 
 class TestValidateHashes(unittest.TestCase):
@@ -54,6 +62,89 @@ class TestValidateHashes(unittest.TestCase):
         outfile.unlink()
 
 
+class TestDownloadVerified(unittest.TestCase):
+    def setUp(self) -> None:
+        self.outdir = pathlib.Path("tests/test_output")
+        self.outdir.mkdir(exist_ok=True)
+
+        # Serve the test data over a local http server
+        self.served_file = pathlib.Path("tests/test_input/v1.primer.bed")
+        handler = functools.partial(
+            SimpleHTTPRequestHandler, directory=str(self.served_file.parent)
+        )
+        handler.log_message = lambda *args: None
+        self.server = HTTPServer(("127.0.0.1", 0), handler)
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.url = f"http://127.0.0.1:{self.server.server_port}/{self.served_file.name}"
+
+    def tearDown(self) -> None:
+        self.server.shutdown()
+        self.server.server_close()
+
+    def test_valid_hash(self):
+        """
+        If the hashes match, the file should be written byte for byte.
+        """
+        outfile = self.outdir / "download_should_write.bed"
+        outfile.unlink(missing_ok=True)
+
+        expected_hash = hashlib.md5(self.served_file.read_bytes()).hexdigest()
+        _download_verified(self.url, outfile, expected_hash)
+
+        self.assertEqual(outfile.read_bytes(), self.served_file.read_bytes())
+        outfile.unlink()
+
+    def test_no_hash(self):
+        """
+        If no hash is given, the file should be written without a check.
+        """
+        outfile = self.outdir / "download_no_hash_should_write.bed"
+        outfile.unlink(missing_ok=True)
+
+        _download_verified(self.url, outfile)
+
+        self.assertEqual(outfile.read_bytes(), self.served_file.read_bytes())
+        outfile.unlink()
+
+    def test_invalid_hash(self):
+        """
+        Ensures that if the hashes do not match, no file (or tmp file) is left behind.
+        """
+        outfile = self.outdir / "download_no_file_should_write.bed"
+        outfile.unlink(missing_ok=True)
+
+        with self.assertRaises(ValueError):
+            _download_verified(self.url, outfile, "invalid")
+
+        self.assertFalse(outfile.exists())
+        self.assertFalse(outfile.with_name(outfile.name + ".tmp").exists())
+
+    def test_http_error(self):
+        """
+        Ensures a missing file raises rather than hashing the error page.
+        """
+        outfile = self.outdir / "download_no_file_should_write.bed"
+
+        with self.assertRaises(requests.exceptions.HTTPError):
+            _download_verified(self.url + ".missing", outfile, "invalid")
+
+        self.assertFalse(outfile.exists())
+
+
+class TestGetSession(unittest.TestCase):
+    def test_get_session_per_thread(self):
+        """
+        Ensures a thread reuses its session, and threads do not share sessions
+        """
+        self.assertIs(get_session(), get_session())
+
+        other_sessions = []
+        thread = threading.Thread(target=lambda: other_sessions.append(get_session()))
+        thread.start()
+        thread.join()
+        self.assertIsNot(other_sessions[0], get_session())
+
+
 class TestFetchIndex(unittest.TestCase):
     def setUp(self) -> None:
         self.index_url = (
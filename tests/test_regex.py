@@ -2,13 +2,20 @@ import unittest
 import re
 import unittest
 import re
+import json
 import pathlib
 
 from primal_page.schemas import (
     validate_schemeversion,
     validate_schemename,
     not_empty,
+    sorted_set,
     BedfileVersion,
+    Collection,
+    Info,
+    SchemeStatus,
+    SCHEMENAME_PATTERN,
+    VERSION_PATTERN,
 )
 from primal_page.bedfiles import (
     V2_PRIMERNAME,
@@ -46,6 +53,7 @@ class TestRegex(unittest.TestCase):
             "artic/covid-400-1",
             "artic-covid-400-1.0!",
             "*artic-covid-400-1.0",
+            "artic-covid-400\n",
         ]
 
         for name in invalid_names:
@@ -77,12 +85,22 @@ class TestRegex(unittest.TestCase):
             "v1.0.0-beta",
             "V1",
             "artic-v1.0.0",
+            "v1.0.0\n",
         ]
 
         for version in invalid_versions:
             with self.assertRaises(ValueError):
                 validate_schemeversion(version)
 
+    def test_public_patterns_anchored(self):
+        """
+        Tests the public patterns reject prefixes when used with re.match
+        """
+        self.assertIsNone(re.match(VERSION_PATTERN, "v1.0.0-beta"))
+        self.assertIsNone(re.match(SCHEMENAME_PATTERN, "artic-covid-400_bad"))
+        self.assertIsNotNone(re.match(VERSION_PATTERN, "v1.0.0"))
+        self.assertIsNotNone(re.match(SCHEMENAME_PATTERN, "artic-covid-400"))
+
     def test_V1PrimerName_ValidNames(self):
         """
         Tests main/V1_PRIMERNAME for valid primer names
@@ -158,6 +176,38 @@ class TestNotEmpty(unittest.TestCase):
                 not_empty(test_case)
 
 
+class TestSortedSet(unittest.TestCase):
+    def test_sorted_set_mixed(self):
+        """
+        Tests ints sort before strs, each in their natural order
+        """
+        self.assertEqual(sorted_set({"b", 10, 2, "a"}), [2, 10, "a", "b"])
+
+    def test_info_json_sets_sorted(self):
+        """
+        Tests the set fields of Info are dumped to json in sorted order
+        """
+        info = Info(
+            ampliconsize=400,
+            schemeversion="v1.0.0",
+            schemename="test",
+            primer_bed_md5="hello",
+            reference_fasta_md5="world",
+            status=SchemeStatus.DRAFT,
+            citations={"b-citation", "a-citation"},
+            authors={"c", "a", "b"},
+            algorithmversion="test",
+            species={"b", 10, 2, "a"},
+            articbedversion=BedfileVersion.V3,
+            collections={Collection.PANEL, Collection.ARTIC},
+        )
+        info_json = json.loads(info.model_dump_json())
+        self.assertEqual(info_json["species"], [2, 10, "a", "b"])
+        self.assertEqual(info_json["authors"], ["a", "b", "c"])
+        self.assertEqual(info_json["citations"], ["a-citation", "b-citation"])
+        self.assertEqual(info_json["collections"], ["ARTIC", "PANEL"])
+
+
 class TestDetermine_primername_version(unittest.TestCase):
     def test_determine_primername_version(self):
         test_cases = {
@@ -244,6 +294,15 @@ class TestDeterminePrimerBedVersion(unittest.TestCase):
             determine_bedfile_version(self.invalidbedfile), BedfileVersion.INVALID
         )
 
+    def test_parse_mixed_primernames(self):
+        # Test a mix of v1 and v2 primernames is invalid, in either order
+        v1_line = ["MN908947.3", "30", "54", "scheme_1_LEFT", "1", "+", "ACGT"]
+        v2_line = ["MN908947.3", "30", "54", "scheme_1_LEFT_0", "1", "+", "ACGT"]
+        for bedlines in [[v1_line, v2_line], [v2_line, v1_line]]:
+            self.assertEqual(
+                determine_bedfile_version(bedlines), BedfileVersion.INVALID
+            )
+
 
 class TestValidateBedfileLineStructure(unittest.TestCase):
     v1bedfile = pathlib.Path("tests/test_input/v1.primer.bed")